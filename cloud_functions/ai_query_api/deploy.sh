@@ -13,6 +13,14 @@ source "$CONFIG_FILE"
 
 # Function-specific configuration
 FUNCTION_NAME="ai_query_assistant"
+CARD_IMAGE_BUCKET="pine-card-images"
+CONFIG_BUCKET="pine-config"
+
+# Cloud Scheduler pings /warmup on this schedule so an instance stays warm
+# while MIN_INSTANCES stays 0 for the free tier; each ping also warms
+# image_processing through its authenticated /warmup. Set empty to skip
+WARMUP_JOB_NAME="$FUNCTION_NAME-warmup"
+WARMUP_SCHEDULE="${WARMUP_SCHEDULE-*/5 * * * *}"
 
 # Print current configuration
 echo "🚀 Preparing to deploy $FUNCTION_NAME..."
@@ -62,6 +70,19 @@ gcloud projects add-iam-policy-binding $PROJECT_ID \
     --member="serviceAccount:$SERVICE_ACCOUNT_EMAIL" \
     --role="roles/aiplatform.user"
 
+# Create the public bucket for card originals and thumbnails if it doesn't exist
+if ! gsutil ls -b "gs://$CARD_IMAGE_BUCKET" &>/dev/null; then
+    echo "🪣 Creating card image bucket: $CARD_IMAGE_BUCKET..."
+    gsutil mb -l $REGION "gs://$CARD_IMAGE_BUCKET"
+    gsutil iam ch allUsers:objectViewer "gs://$CARD_IMAGE_BUCKET"
+fi
+gsutil iam ch "serviceAccount:$SERVICE_ACCOUNT_EMAIL:objectAdmin" "gs://$CARD_IMAGE_BUCKET"
+
+# Read the directory registry, rolodexes and configs in the config bucket, and
+# write parsed index snapshots (new objects only; snapshots are never overwritten)
+gsutil iam ch "serviceAccount:$SERVICE_ACCOUNT_EMAIL:objectViewer" "gs://$CONFIG_BUCKET"
+gsutil iam ch "serviceAccount:$SERVICE_ACCOUNT_EMAIL:objectCreator" "gs://$CONFIG_BUCKET"
+
 # Deploy the function
 echo "📦 Deploying function..."
 
@@ -77,7 +98,7 @@ gcloud functions deploy $FUNCTION_NAME \
     --max-instances=$MAX_INSTANCES \
     --ingress-settings=$INGRESS_SETTINGS \
     --entry-point=$FUNCTION_NAME \
-    --set-env-vars="PROJECT_ID=$PROJECT_ID,LOCATION=$REGION"
+    --set-env-vars="PROJECT_ID=$PROJECT_ID,LOCATION=$REGION,CARD_IMAGE_BUCKET=$CARD_IMAGE_BUCKET"
 
 # Check deployment status
 if [ $? -eq 0 ]; then
@@ -86,10 +107,29 @@ if [ $? -eq 0 ]; then
     # Get the function URL
     FUNCTION_URL=$(gcloud functions describe $FUNCTION_NAME --region=$REGION --format='get(serviceConfig.uri)')
     echo "📍 Function URL: $FUNCTION_URL"
+
+    # Keep an instance warm between user requests
+    if [ -n "$WARMUP_SCHEDULE" ]; then
+        echo "⏰ Scheduling warm-up pings: $WARMUP_SCHEDULE"
+        gcloud services enable cloudscheduler.googleapis.com
+        if gcloud scheduler jobs describe $WARMUP_JOB_NAME --location=$REGION &>/dev/null; then
+            SCHEDULER_COMMAND="update"
+        else
+            SCHEDULER_COMMAND="create"
+        fi
+        gcloud scheduler jobs $SCHEDULER_COMMAND http $WARMUP_JOB_NAME \
+            --location=$REGION \
+            --schedule="$WARMUP_SCHEDULE" \
+            --uri="$FUNCTION_URL/warmup" \
+            --http-method=GET \
+            --attempt-deadline=30s
+    fi
     
     echo ""
     echo "🎉 Deployment complete! You can now use the function."
     echo "Example curl command:"
+    echo "Warm-up / readiness check (pinged by the $WARMUP_JOB_NAME scheduler job):"
+    echo "curl $FUNCTION_URL/warmup"
     echo "curl -X POST $FUNCTION_URL -H 'Content-Type: application/json' -d '{\"prompt\":\"Hello, how are you?\"}'"
 else
     echo "❌ Deployment failed"
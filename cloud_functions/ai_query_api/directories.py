@@ -0,0 +1,289 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+import logging
+import os
+import sys
+import json
+import threading
+import time
+from google.cloud import storage
+from bs4 import BeautifulSoup
+from models import BusinessRecord, dump_index_snapshot, load_index_snapshot, normalize_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = os.getenv("DEFAULT_DIRECTORY", "lkn")
+
+# Bounds for the in-memory set of parsed directory indexes
+MAX_LOADED_DIRECTORIES = int(os.getenv("MAX_LOADED_DIRECTORIES", "8"))
+MAX_DIRECTORY_MEMORY_BYTES = int(os.getenv("MAX_DIRECTORY_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+# Built-in registry; extended by directories.json in the config bucket
+BUILTIN_DIRECTORIES = {
+    "lkn": {
+        "name": "Lake Norman Small Business Network",
+        "bucket": "pine-config",
+        "blob": "lknbusiness-rolodex.html",
+        "config_blob": "pine_config.txt",
+        "line": 171
+    }
+}
+
+# Seconds before directories.json is read again, so new directories appear without a restart
+REGISTRY_TTL_SECONDS = int(os.getenv("REGISTRY_TTL_SECONDS", os.getenv("CONFIG_TTL_SECONDS", "300")))
+
+_registry: Optional[Dict[str, Dict[str, Any]]] = None
+_registry_loaded_at = 0.0
+_registry_lock = threading.Lock()
+
+_storage_client: Optional[storage.Client] = None
+
+_indexes: "OrderedDict[str, DirectoryIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+_load_locks: Dict[str, threading.Lock] = {}
+
+class DirectoryIndex:
+    """Parsed business index for a single directory."""
+
+    def __init__(self, directory: str, prompt_html: str, businesses: List[BusinessRecord]):
+        self.directory = directory
+        self.prompt_html = prompt_html
+        self.businesses = businesses
+
+        # Lookup tables for answering structured queries locally
+        self.by_name: Dict[str, List[BusinessRecord]] = {}
+        self.by_category: Dict[str, List[BusinessRecord]] = {}
+        self.by_domain: Dict[str, List[BusinessRecord]] = {}
+        for record in businesses:
+            if record.name:
+                self.by_name.setdefault(normalize_text(record.name), []).append(record)
+            if record.category:
+                self.by_category.setdefault(normalize_text(record.category), []).append(record)
+            if record.domain:
+                self.by_domain.setdefault(record.domain, []).append(record)
+
+        self.memory_bytes = _deep_size([prompt_html, businesses, self.by_name, self.by_category, self.by_domain])
+
+def _deep_size(obj: Any, seen: set = None) -> int:
+    """Approximate the memory footprint of an object and everything it references.
+
+    Args:
+        obj (Any): Object to measure
+        seen (set, optional): Ids of objects already counted. Defaults to None.
+
+    Returns:
+        int: Size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(_deep_size(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+def get_storage_client() -> storage.Client:
+    """Get the shared Cloud Storage client, creating it on first use.
+
+    Returns:
+        storage.Client: Storage client
+    """
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client()
+    return _storage_client
+
+def _registry_fresh() -> bool:
+    """Whether the cached registry was loaded within REGISTRY_TTL_SECONDS."""
+    return _registry is not None and time.monotonic() - _registry_loaded_at < REGISTRY_TTL_SECONDS
+
+def get_registry() -> Dict[str, Dict[str, Any]]:
+    """Get the directory registry, reloading directories.json from Cloud Storage after the TTL.
+
+    If the read fails, the last loaded registry (or the built-in one) is used
+    without being cached, so the next call tries again.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Directory settings keyed by directory id
+    """
+    global _registry, _registry_loaded_at
+    if _registry_fresh():
+        return _registry
+    with _registry_lock:
+        if _registry_fresh():
+            return _registry
+        registry = dict(BUILTIN_DIRECTORIES)
+        try:
+            storage_client = get_storage_client()
+            blob = storage_client.bucket('pine-config').blob('directories.json')
+            if blob.exists():
+                registry.update(json.loads(blob.download_as_text()))
+                logger.info(f"📚 Loaded directory registry with {len(registry)} directories")
+        except Exception as e:
+            logger.error(f"Error reading directory registry, using last known directories: {e}")
+            return _registry or registry
+        _registry = registry
+        _registry_loaded_at = time.monotonic()
+        return _registry
+
+def get_directory(directory: str = None) -> Optional[Dict[str, Any]]:
+    """Look up a directory's settings in the registry.
+
+    Args:
+        directory (str, optional): Directory id. Defaults to DEFAULT_DIRECTORY.
+
+    Returns:
+        Optional[Dict[str, Any]]: Directory settings, or None if unknown
+    """
+    return get_registry().get(directory or DEFAULT_DIRECTORY)
+
+def parse_rolodex(html: str, line: int = None) -> DirectoryIndex:
+    """Parse a rolodex HTML page into a prompt snippet and a list of businesses.
+
+    Args:
+        html (str): Full rolodex HTML
+        line (int, optional): 1-based line holding the business cards. If not
+            set, every line containing a card is used.
+
+    Returns:
+        DirectoryIndex: Parsed index (directory id left empty)
+    """
+    html_lines = html.splitlines()
+    if line:
+        if len(html_lines) < line:
+            raise ValueError("Business data file does not contain enough lines")
+        cards_html = html_lines[line - 1]
+    else:
+        cards_html = "".join(l for l in html_lines if 'class="card"' in l or 'class="vcard"' in l)
+
+    # Remove any unescaped quotes and normalize whitespace
+    prompt_html = cards_html.replace('\\"', '"').replace('"', '\\"').strip()
+
+    businesses = []
+    category = None
+    soup = BeautifulSoup(cards_html, 'html.parser')
+    for tag in soup.find_all(['h2', 'div']):
+        classes = tag.get('class') or []
+        if tag.name == 'h2' and 'category' in classes:
+            category = tag.get_text(strip=True)
+        elif tag.name == 'div' and ('card' in classes or 'vcard' in classes):
+            name_tag = tag.find('h2', class_='pname')
+            link_tag = tag.find('a')
+            img_tag = tag.find('img')
+            businesses.append(BusinessRecord(
+                name_tag.get_text(strip=True) if name_tag else None,
+                category,
+                link_tag.get('href') if link_tag else None,
+                img_tag.get('src') if img_tag else None
+            ))
+    return DirectoryIndex("", prompt_html, businesses)
+
+def _load_index(directory: str, settings: Dict[str, Any]) -> DirectoryIndex:
+    """Load a directory's index from its parsed snapshot, or download and parse the rolodex.
+
+    Snapshots are named after the rolodex blob's generation and the parsed
+    line, so uploading a new rolodex or changing the line invalidates them.
+    """
+    bucket = get_storage_client().bucket(settings.get("bucket", "pine-config"))
+    blob = bucket.get_blob(settings["blob"])
+    if blob is None:
+        raise FileNotFoundError(f"Rolodex {settings['blob']} not found")
+
+    line = settings.get("line")
+    snapshot_blob = bucket.blob(f"index-snapshots/{directory}-{blob.generation}-line{line or 'all'}.json")
+    try:
+        if snapshot_blob.exists():
+            prompt_html, records = load_index_snapshot(snapshot_blob.download_as_text())
+            index = DirectoryIndex(directory, prompt_html, records)
+            logger.info(f"📇 Loaded directory '{directory}' from snapshot: {len(records)} businesses, {index.memory_bytes} bytes")
+            return index
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable snapshot for directory '{directory}': {e}")
+
+    index = parse_rolodex(blob.download_as_text(), line)
+    index.directory = directory
+    logger.info(f"📇 Loaded directory '{directory}': {len(index.businesses)} businesses, {index.memory_bytes} bytes")
+    try:
+        snapshot_blob.upload_from_string(dump_index_snapshot(index.prompt_html, index.businesses),
+                                         content_type="application/json")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save snapshot for directory '{directory}': {e}")
+    return index
+
+def _evict_locked(keep: str) -> None:
+    """Evict least recently used indexes until within bounds. Caller holds _indexes_lock."""
+    while len(_indexes) > 1 and (
+        len(_indexes) > MAX_LOADED_DIRECTORIES
+        or sum(i.memory_bytes for i in _indexes.values()) > MAX_DIRECTORY_MEMORY_BYTES
+    ):
+        oldest = next(iter(_indexes))
+        if oldest == keep:
+            _indexes.move_to_end(oldest)
+            continue
+        evicted = _indexes.pop(oldest)
+        logger.info(f"♻️ Evicted directory '{oldest}' ({evicted.memory_bytes} bytes)")
+
+def get_directory_index(directory: str = None) -> Optional[DirectoryIndex]:
+    """Get the parsed index for a directory, loading it on first use.
+
+    Args:
+        directory (str, optional): Directory id. Defaults to DEFAULT_DIRECTORY.
+
+    Returns:
+        Optional[DirectoryIndex]: Parsed index, or None if unknown or unavailable
+    """
+    directory = directory or DEFAULT_DIRECTORY
+    with _indexes_lock:
+        index = _indexes.get(directory)
+        if index is not None:
+            _indexes.move_to_end(directory)
+            return index
+        load_lock = _load_locks.setdefault(directory, threading.Lock())
+
+    settings = get_directory(directory)
+    if settings is None:
+        logger.warning(f"Unknown directory: {directory}")
+        return None
+
+    # Only one thread downloads a given directory; the rest wait for it
+    with load_lock:
+        with _indexes_lock:
+            index = _indexes.get(directory)
+            if index is not None:
+                _indexes.move_to_end(directory)
+                return index
+        try:
+            index = _load_index(directory, settings)
+        except Exception as e:
+            logger.error(f"Error loading directory '{directory}': {e}")
+            return None
+        with _indexes_lock:
+            _indexes[directory] = index
+            _evict_locked(directory)
+        return index
+
+def directory_stats() -> Dict[str, Any]:
+    """Report the loaded directories and their memory usage.
+
+    Returns:
+        Dict[str, Any]: Per-directory business counts and bytes, plus totals
+    """
+    with _indexes_lock:
+        loaded = {
+            name: {"businesses": len(index.businesses), "memory_bytes": index.memory_bytes}
+            for name, index in _indexes.items()
+        }
+    return {
+        "loaded": loaded,
+        "total_memory_bytes": sum(d["memory_bytes"] for d in loaded.values()),
+        "max_loaded_directories": MAX_LOADED_DIRECTORIES,
+        "max_memory_bytes": MAX_DIRECTORY_MEMORY_BYTES
+    }
@@ -0,0 +1,300 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import logging
+import os
+import threading
+import time
+import requests
+from urllib.parse import urlparse, urlunparse
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds allowed to establish a connection
+CONNECT_TIMEOUT = float(os.getenv("WEBSITE_CONNECT_TIMEOUT", "3"))
+
+# Seconds allowed for a whole page fetch, including the hedged attempt
+FETCH_DEADLINE = float(os.getenv("WEBSITE_FETCH_DEADLINE", "6"))
+
+# Seconds allowed for fetching every website of one query; the p99 target for the stage
+STAGE_DEADLINE = float(os.getenv("WEBSITE_STAGE_DEADLINE", "8"))
+
+# Hedge delay bounds and the delay used before a host has enough samples
+MIN_HEDGE_DELAY = 0.2
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_SAMPLES = 5
+
+# Latency samples kept per host and for the whole stage
+HISTORY_SIZE = 100
+
+# Largest page body read, in bytes
+MAX_PAGE_BYTES = 1024 * 1024
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+class LatencyHistogram:
+    """Recent latency samples with percentile lookups.
+
+    Samples are successful latencies plus censored ones: attempts abandoned
+    at the deadline are recorded at their elapsed time, a lower bound on
+    their true latency, so slow hosts are not hidden from the percentiles.
+    Failures are only counted, since a fast error says nothing about how long
+    a successful fetch takes.
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.samples = deque(maxlen=size)
+        self.censored = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of a successful attempt."""
+        with self.lock:
+            self.samples.append(seconds)
+
+    def record_censored(self, seconds: float) -> None:
+        """Record an attempt abandoned at the deadline after running for seconds."""
+        with self.lock:
+            self.samples.append(seconds)
+            self.censored += 1
+
+    def record_failure(self) -> None:
+        """Count an attempt that failed before the deadline."""
+        with self.lock:
+            self.failures += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get the p-th percentile (0-100) of recent samples, or None without enough data."""
+        with self.lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def summary(self) -> Dict[str, Any]:
+        """Summarize the histogram for stats reporting."""
+        return {
+            "samples": len(self.samples),
+            "censored": self.censored,
+            "failures": self.failures,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99)
+        }
+
+_hosts: Dict[str, LatencyHistogram] = {}
+_hosts_lock = threading.Lock()
+_stage = LatencyHistogram()
+
+# Separate pools so stage tasks never wait on attempts queued behind them
+_stage_pool = ThreadPoolExecutor(max_workers=8)
+_attempt_pool = ThreadPoolExecutor(max_workers=16)
+_sessions = threading.local()
+
+# Deadline of the stage the current thread is running a call for, if any
+_stage_state = threading.local()
+
+def _host_stats(host: str) -> LatencyHistogram:
+    """Get the latency histogram for a host."""
+    with _hosts_lock:
+        return _hosts.setdefault(host, LatencyHistogram())
+
+def _session() -> requests.Session:
+    """Get this thread's HTTP session, reusing its connection pool."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _sessions.session = session
+    return session
+
+def hedge_delay(host: str) -> float:
+    """Get how long to wait on a host before sending a hedged attempt.
+
+    Args:
+        host (str): Host name
+
+    Returns:
+        float: Delay in seconds, the host's p90 latency when known
+    """
+    p90 = _host_stats(host).percentile(90)
+    if p90 is None:
+        return DEFAULT_HEDGE_DELAY
+    return min(max(p90, MIN_HEDGE_DELAY), FETCH_DEADLINE / 2)
+
+def _variants(url: str) -> List[str]:
+    """Get the URL followed by its other-scheme variant."""
+    parsed = urlparse(url)
+    other = "http" if parsed.scheme == "https" else "https"
+    return [url, urlunparse(parsed._replace(scheme=other))]
+
+def _attempt(url: str, verify: bool, deadline: float, cancel: threading.Event) -> str:
+    """Fetch a page, giving up at the deadline or when another attempt has won.
+
+    Args:
+        url (str): Page URL
+        verify (bool): Whether to verify SSL certificates
+        deadline (float): time.monotonic() value to stop at
+        cancel (threading.Event): Set when the fetch is no longer needed
+
+    Returns:
+        str: Page HTML
+    """
+    start = time.monotonic()
+    host = urlparse(url).netloc
+    try:
+        read_timeout = max(deadline - start, 0.1)
+        with _session().get(url, timeout=(CONNECT_TIMEOUT, read_timeout), verify=verify, stream=True) as response:
+            response.raise_for_status()
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=16384):
+                if cancel.is_set():
+                    raise requests.ConnectionError("Cancelled after another attempt finished")
+                if time.monotonic() > deadline:
+                    raise requests.Timeout(f"Deadline exceeded reading {url}")
+                body.extend(chunk)
+                if len(body) >= MAX_PAGE_BYTES:
+                    break
+            encoding = response.encoding or response.apparent_encoding or "utf-8"
+            html = bytes(body).decode(encoding, errors="replace")
+        _host_stats(host).record(time.monotonic() - start)
+        return html
+    except Exception:
+        now = time.monotonic()
+        if now >= deadline:
+            # Abandoned unfinished; the elapsed time is a lower bound on its latency
+            _host_stats(host).record_censored(now - start)
+        elif not cancel.is_set():
+            _host_stats(host).record_failure()
+        raise
+
+def fetch_html(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """Fetch a page with a deadline, hedging slow hosts with the other scheme.
+
+    The URL is requested first. If it has not finished after the host's p90
+    latency, the https/http variant is raced against it and whichever
+    finishes first wins; the other is cancelled. SSL failures are retried
+    without verification. Inside run_stage the fetch also stops at the
+    stage deadline.
+
+    Args:
+        url (str): Page URL
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: Page HTML and the URL that served
+            it, or (None, None) if every attempt failed
+    """
+    host = urlparse(url).netloc
+    deadline = time.monotonic() + FETCH_DEADLINE
+    stage_deadline = getattr(_stage_state, "deadline", None)
+    if stage_deadline is not None:
+        deadline = min(deadline, stage_deadline)
+    cancel = threading.Event()
+    primary, alternate = _variants(url)
+
+    pending = {_attempt_pool.submit(_attempt, primary, True, deadline, cancel): primary}
+    hedged = False
+    insecure_retried = False
+    try:
+        while pending:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                logger.warning(f"⏰ Fetch deadline exceeded for {url}")
+                return None, None
+            if not hedged:
+                timeout = min(timeout, hedge_delay(host))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done and not hedged:
+                logger.info(f"🔀 Hedging slow fetch of {url} with {alternate}")
+                pending[_attempt_pool.submit(_attempt, alternate, True, deadline, cancel)] = alternate
+                hedged = True
+                continue
+
+            for future in done:
+                attempt_url = pending.pop(future)
+                try:
+                    return future.result(), attempt_url
+                except requests.exceptions.SSLError:
+                    if attempt_url == primary and not insecure_retried:
+                        # Try again without SSL verification if SSL fails
+                        logger.warning(f"⚠️ SSL verification failed for {attempt_url}, retrying without verification")
+                        pending[_attempt_pool.submit(_attempt, attempt_url, False, deadline, cancel)] = attempt_url
+                        insecure_retried = True
+                except requests.HTTPError as e:
+                    # The server answered; the other scheme would serve the same site
+                    logger.warning(f"❌ Attempt failed for {attempt_url}: {e}")
+                except Exception as e:
+                    logger.warning(f"❌ Attempt failed for {attempt_url}: {e}")
+                    if not hedged:
+                        pending[_attempt_pool.submit(_attempt, alternate, True, deadline, cancel)] = alternate
+                        hedged = True
+        return None, None
+    finally:
+        cancel.set()
+
+def _run_in_stage(func, item: str, deadline: float) -> Any:
+    """Run one stage call, skipping it if the stage deadline passed while it was queued."""
+    if time.monotonic() >= deadline:
+        raise TimeoutError("Stage deadline passed before the call started")
+    _stage_state.deadline = deadline
+    try:
+        return func(item)
+    finally:
+        _stage_state.deadline = None
+
+def run_stage(func, items: List[str]) -> Dict[str, Any]:
+    """Run func on every item concurrently, bounded by the stage deadline.
+
+    Calls still queued at the deadline are cancelled, and running fetch_html
+    calls stop at the deadline, so a slow stage does not hold workers the
+    next query needs.
+
+    Args:
+        func (Callable[[str], Any]): Function to run, e.g. a page fetcher
+        items (List[str]): Arguments, one call each
+
+    Returns:
+        Dict[str, Any]: Results keyed by item, for calls that finished in time
+    """
+    start = time.monotonic()
+    deadline = start + STAGE_DEADLINE
+    futures = {_stage_pool.submit(_run_in_stage, func, item, deadline): item for item in dict.fromkeys(items)}
+    done, not_done = wait(futures, timeout=STAGE_DEADLINE)
+    if not_done:
+        logger.warning(f"⏰ Website stage deadline reached with {len(not_done)} fetches unfinished")
+        for future in not_done:
+            future.cancel()
+    results = {}
+    for future in done:
+        try:
+            results[futures[future]] = future.result()
+        except Exception as e:
+            logger.error(f"❌ Stage call failed for {futures[future]}: {e}")
+    if not_done:
+        _stage.record_censored(time.monotonic() - start)
+    else:
+        _stage.record(time.monotonic() - start)
+    return results
+
+def website_fetch_stats() -> Dict[str, Any]:
+    """Report per-host and whole-stage website latency.
+
+    Returns:
+        Dict[str, Any]: Latency percentiles in seconds, per host and for the stage
+    """
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    return {
+        "stage": _stage.summary(),
+        "stage_deadline": STAGE_DEADLINE,
+        "hosts": {host: stats.summary() for host, stats in hosts.items()}
+    }
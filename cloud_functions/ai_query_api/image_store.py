@@ -0,0 +1,236 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from PIL import Image, features
+from urllib.parse import urlparse
+from directories import get_storage_client
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Publicly readable bucket holding card originals and thumbnails
+CARD_IMAGE_BUCKET = os.getenv("CARD_IMAGE_BUCKET", "pine-card-images")
+
+# Longest edge of generated thumbnails, in pixels
+THUMBNAIL_MAX_PX = int(os.getenv("THUMBNAIL_MAX_PX", "320"))
+THUMBNAIL_QUALITY = 80
+
+# Content-addressed objects never change, so browsers may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MAX_CACHED_IMAGES = int(os.getenv("MAX_CACHED_IMAGES", "5000"))
+_images: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_images_lock = threading.Lock()
+_url_locks: Dict[str, threading.Lock] = {}
+
+# Cards that failed to store are not retried for this many seconds
+FAILURE_TTL_SECONDS = int(os.getenv("CARD_IMAGE_FAILURE_TTL_SECONDS", "300"))
+_failures: "OrderedDict[str, float]" = OrderedDict()
+
+# Reused HTTP session for card downloads
+_http = requests.Session()
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_pools_lock = threading.Lock()
+
+def _make_thumbnail(data: bytes, max_px: int, fmt: str) -> bytes:
+    """Resize an image so its longest edge is at most max_px.
+
+    Runs on the download thread: Pillow releases the GIL while resizing and
+    encoding, and threads avoid forking a multithreaded process.
+
+    Args:
+        data (bytes): Original image bytes
+        max_px (int): Longest edge of the thumbnail
+        fmt (str): Pillow output format, WEBP or JPEG
+
+    Returns:
+        bytes: Encoded thumbnail
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((max_px, max_px))
+        out = io.BytesIO()
+        image.save(out, format=fmt, quality=THUMBNAIL_QUALITY, optimize=True)
+        return out.getvalue()
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    """Get the shared thread pool for concurrent card downloads and thumbnails."""
+    global _thread_pool
+    with _pools_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=8)
+        return _thread_pool
+
+def public_url(name: str) -> str:
+    """Get the public URL of an object in the card image bucket."""
+    return f"https://storage.googleapis.com/{CARD_IMAGE_BUCKET}/{name}"
+
+def _remember(card_url: str, entry: Dict[str, str]) -> None:
+    """Keep a stored image entry in memory."""
+    with _images_lock:
+        _images[card_url] = entry
+        _images.move_to_end(card_url)
+        while len(_images) > MAX_CACHED_IMAGES:
+            _images.popitem(last=False)
+
+def _remember_failure(card_url: str) -> None:
+    """Record that storing a card failed, dropping expired and excess failures."""
+    now = time.monotonic()
+    with _images_lock:
+        _failures[card_url] = now
+        _failures.move_to_end(card_url)
+        while _failures and (
+            len(_failures) > MAX_CACHED_IMAGES
+            or now - next(iter(_failures.values())) >= FAILURE_TTL_SECONDS
+        ):
+            _failures.popitem(last=False)
+
+def get_known_card_image(card_url: str) -> Optional[Dict[str, str]]:
+    """Get a card's stored image URLs if this instance already knows them.
+
+    Args:
+        card_url (str): URL of the business card image
+
+    Returns:
+        Optional[Dict[str, str]]: original_url and thumbnail_url, or None
+    """
+    with _images_lock:
+        entry = _images.get(card_url)
+        if entry is not None:
+            _images.move_to_end(card_url)
+        return entry
+
+def _recently_failed(card_url: str) -> bool:
+    """Whether storing a card failed within FAILURE_TTL_SECONDS."""
+    with _images_lock:
+        failed_at = _failures.get(card_url)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < FAILURE_TTL_SECONDS:
+            return True
+        del _failures[card_url]
+        return False
+
+def store_card_image(card_url: str) -> Optional[Dict[str, str]]:
+    """Fetch a card image once and store its original and a thumbnail.
+
+    Objects are named by the SHA-256 of the image content, and a manifest
+    keyed by the card URL lets every instance find them without downloading
+    the card again.
+
+    Args:
+        card_url (str): URL of the business card image
+
+    Returns:
+        Optional[Dict[str, str]]: original_url and thumbnail_url, or None if
+            the image could not be fetched or stored
+    """
+    entry = get_known_card_image(card_url)
+    if entry is not None or _recently_failed(card_url):
+        return entry
+
+    with _images_lock:
+        url_lock = _url_locks.setdefault(card_url, threading.Lock())
+
+    with url_lock:
+        entry = get_known_card_image(card_url)
+        if entry is not None or _recently_failed(card_url):
+            return entry
+        try:
+            bucket = get_storage_client().bucket(CARD_IMAGE_BUCKET)
+            manifest_blob = bucket.blob(f"manifests/{hashlib.sha256(card_url.encode()).hexdigest()}.json")
+            if manifest_blob.exists():
+                entry = json.loads(manifest_blob.download_as_text())
+                _remember(card_url, entry)
+                return entry
+
+            # Download the card from its origin; this is the only origin fetch
+            logger.info(f"🖼️ Fetching card image: {card_url}")
+            response = _http.get(card_url, timeout=15)
+            response.raise_for_status()
+            data = response.content
+            digest = hashlib.sha256(data).hexdigest()
+
+            fmt, ext = ("WEBP", "webp") if features.check("webp") else ("JPEG", "jpg")
+            thumbnail = _make_thumbnail(data, THUMBNAIL_MAX_PX, fmt)
+
+            original_ext = os.path.splitext(urlparse(card_url).path)[1] or ".jpg"
+            original_name = f"originals/{digest}{original_ext}"
+            original_blob = bucket.blob(original_name)
+            if not original_blob.exists():
+                original_blob.cache_control = IMMUTABLE_CACHE_CONTROL
+                original_blob.upload_from_string(data, content_type=response.headers.get("Content-Type", "image/jpeg"))
+
+            thumbnail_name = f"thumbs/{digest}-{THUMBNAIL_MAX_PX}.{ext}"
+            thumbnail_blob = bucket.blob(thumbnail_name)
+            thumbnail_blob.cache_control = IMMUTABLE_CACHE_CONTROL
+            thumbnail_blob.upload_from_string(thumbnail, content_type=f"image/{'webp' if ext == 'webp' else 'jpeg'}")
+            logger.info(f"✅ Stored card {digest[:12]}: {len(data)} bytes original, {len(thumbnail)} bytes thumbnail")
+
+            entry = {"original_url": public_url(original_name), "thumbnail_url": public_url(thumbnail_name)}
+            manifest_blob.upload_from_string(json.dumps(entry), content_type="application/json")
+            _remember(card_url, entry)
+            return entry
+        except Exception as e:
+            logger.error(f"Error storing card image {card_url}: {e}")
+            _remember_failure(card_url)
+            return None
+        finally:
+            # The outcome is cached by now, so later callers return before taking a lock
+            with _images_lock:
+                _url_locks.pop(card_url, None)
+
+def known_card_images(card_urls: List[str]) -> Dict[str, Dict[str, str]]:
+    """Get the stored image URLs of the cards this instance already knows.
+
+    Args:
+        card_urls (List[str]): URLs of business card images
+
+    Returns:
+        Dict[str, Dict[str, str]]: Stored image URLs keyed by card URL
+    """
+    results = {}
+    for card_url in card_urls:
+        entry = get_known_card_image(card_url) if card_url else None
+        if entry is not None:
+            results[card_url] = entry
+    return results
+
+def prefetch_card_images(card_urls: List[str], timeout: float = None) -> Dict[str, Dict[str, str]]:
+    """Store several card images concurrently.
+
+    Args:
+        card_urls (List[str]): URLs of business card images
+        timeout (float, optional): Seconds to wait; None waits for all, 0 only
+            schedules the fetches in the background. Defaults to None.
+
+    Returns:
+        Dict[str, Dict[str, str]]: Stored image URLs keyed by card URL, for the
+            cards that finished in time
+    """
+    results = {}
+    pending = {}
+    for card_url in dict.fromkeys(url for url in card_urls if url):
+        entry = get_known_card_image(card_url)
+        if entry is not None:
+            results[card_url] = entry
+        elif not _recently_failed(card_url):
+            pending[_get_thread_pool().submit(store_card_image, card_url)] = card_url
+
+    if pending and timeout != 0:
+        done, _ = wait(pending, timeout=timeout)
+        for future in done:
+            entry = future.result()
+            if entry is not None:
+                results[pending[future]] = entry
+    return results
@@ -0,0 +1,193 @@
+from typing import Dict, Any, List, Optional
+import difflib
+import logging
+import re
+import threading
+import time
+from directories import get_directory_index
+from image_store import get_known_card_image, prefetch_card_images
+from models import BusinessInfo, BusinessRecord, domain_of, normalize_text
+from utils import get_cached_card_info
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Minimum similarity for fuzzy name and category matches
+FUZZY_CUTOFF = 0.85
+
+# Longest query, in words, treated as a possible name lookup
+MAX_NAME_WORDS = 5
+
+PHONE_PATTERN = re.compile(r"^\+?1?[\s.\-]*\(?\d{3}\)?[\s.\-]*\d{3}[\s.\-]*\d{4}$")
+# Top-level domains small-business websites use; other dotted words (e.g. "St.Louis") are not domains
+KNOWN_TLDS = ("com", "net", "org", "biz", "info", "us", "co", "io", "me", "edu", "gov", "app", "dev",
+              "site", "online", "shop", "store", "business", "agency", "church", "realty", "law")
+DOMAIN_PATTERN = re.compile(
+    r"^(https?://)?(www\.)?[a-z0-9\-]+(\.[a-z0-9\-]+)*\.(" + "|".join(KNOWN_TLDS) + r")(:\d+)?(/\S*)?$",
+    re.IGNORECASE
+)
+
+_counters = {"local": 0, "llm": 0, "phone": 0, "domain": 0, "category": 0, "name": 0}
+_counters_lock = threading.Lock()
+
+def _count(key: str) -> None:
+    """Increment a traffic counter."""
+    with _counters_lock:
+        _counters[key] += 1
+
+def record_llm_query() -> None:
+    """Count a query that fell through to Gemini."""
+    _count("llm")
+
+def local_answer_stats() -> Dict[str, Any]:
+    """Report how much traffic was answered without calling Gemini.
+
+    Returns:
+        Dict[str, Any]: Counters per lookup type and the share served locally
+    """
+    with _counters_lock:
+        stats = dict(_counters)
+    total = stats["local"] + stats["llm"]
+    stats["local_share"] = stats["local"] / total if total else 0.0
+    return stats
+
+def classify_query(query: str) -> Optional[str]:
+    """Classify a query as a structured lookup.
+
+    Args:
+        query (str): User's search query
+
+    Returns:
+        Optional[str]: "phone", "domain" or "text" (name or category), or None
+            for open-ended queries that need the LLM
+    """
+    query = query.strip()
+    if PHONE_PATTERN.match(query):
+        return "phone"
+    if DOMAIN_PATTERN.match(query):
+        return "domain"
+    if len(normalize_text(query).split()) <= MAX_NAME_WORDS:
+        return "text"
+    return None
+
+def _digits(value: Optional[str]) -> str:
+    """Get the last ten digits of a phone number."""
+    return re.sub(r"\D", "", value or "")[-10:]
+
+def _find_by_phone(index, query: str) -> List[BusinessRecord]:
+    """Find businesses whose cached card has the queried phone number."""
+    digits = _digits(query)
+    matches = []
+    for record in index.businesses:
+        info = get_cached_card_info(record.card_link) if record.card_link else None
+        if info is not None and _digits(info.phone_number) == digits:
+            matches.append(record)
+    return matches
+
+def _find_by_category(index, text: str) -> Optional[List[BusinessRecord]]:
+    """Find businesses in the category closest to the query, if any is close enough."""
+    if text in index.by_category:
+        return index.by_category[text]
+    close = difflib.get_close_matches(text, index.by_category.keys(), n=1, cutoff=FUZZY_CUTOFF)
+    return index.by_category[close[0]] if close else None
+
+def _find_by_name(index, text: str) -> Optional[List[BusinessRecord]]:
+    """Find businesses by listed name or cached card business name."""
+    if text in index.by_name:
+        return index.by_name[text]
+
+    # Card names go in a separate map so the shared index lists are never changed
+    card_names: Dict[str, List[BusinessRecord]] = {}
+    for record in index.businesses:
+        info = get_cached_card_info(record.card_link) if record.card_link else None
+        if info is not None and info.business_name:
+            card_names.setdefault(normalize_text(info.business_name), []).append(record)
+
+    close = [text] if text in card_names else difflib.get_close_matches(
+        text, set(index.by_name) | set(card_names), n=3, cutoff=FUZZY_CUTOFF)
+    if not close:
+        return None
+    matches = {}
+    for name in close:
+        for record in index.by_name.get(name, []) + card_names.get(name, []):
+            matches.setdefault(id(record), record)
+    return list(matches.values())
+
+def _build_results(records: List[BusinessRecord], reason: str) -> Dict[str, Any]:
+    """Build a response in the same shape as generate_search_params."""
+    matched = []
+    for record in records:
+        info = get_cached_card_info(record.card_link) if record.card_link else None
+        if info is None:
+            info = BusinessInfo(business_name=record.name)
+        card_image = get_known_card_image(record.card_link) if record.card_link else None
+        matched.append({
+            "business_info": info.to_dict(),
+            "homepage_link": record.business_link,
+            "card_link": record.card_link,
+            "thumbnail_url": card_image["thumbnail_url"] if card_image else None
+        })
+
+    # Store missing thumbnails in the background so later lookups can include them
+    prefetch_card_images([m["card_link"] for m in matched if not m["thumbnail_url"]], timeout=0)
+
+    best_match = {"business_link": None, "card_link": None, "reason": reason}
+    if matched:
+        best_match = {
+            "business_link": matched[0]["homepage_link"],
+            "card_link": matched[0]["card_link"],
+            "business_name": matched[0]["business_info"]["business_name"],
+            "thumbnail_url": matched[0]["thumbnail_url"],
+            "reason": reason
+        }
+    return {"matched_businesses": matched, "match_count": len(matched), "best_match": best_match}
+
+def answer_locally(query: str, directory: str = None) -> Optional[Dict[str, Any]]:
+    """Answer name, category, phone and domain lookups from the parsed rolodex.
+
+    Args:
+        query (str): User's search query
+        directory (str, optional): Directory id. Defaults to the default directory.
+
+    Returns:
+        Optional[Dict[str, Any]]: Search results, or None if the query needs the LLM
+    """
+    start = time.perf_counter()
+    kind = classify_query(query)
+    if kind is None:
+        return None
+    index = get_directory_index(directory)
+    if index is None:
+        return None
+
+    # Lookups that find nothing fall through to the LLM
+    results = None
+    if kind == "phone":
+        # Phone numbers only come from cards this instance has already processed
+        records = _find_by_phone(index, query)
+        if records:
+            results = _build_results(records, f"Business card lists the phone number {query.strip()}")
+    elif kind == "domain":
+        records = index.by_domain.get(domain_of(query if "//" in query else f"http://{query.strip()}"))
+        if records:
+            results = _build_results(records, f"Website domain matches {query.strip()}")
+    else:
+        text = normalize_text(query)
+        records = _find_by_category(index, text)
+        if records:
+            kind = "category"
+            results = _build_results(records, f"Listed in the {records[0].category} category")
+        else:
+            records = _find_by_name(index, text)
+            if records:
+                kind = "name"
+                results = _build_results(records, f"Business name matches \"{query.strip()}\"")
+
+    if results is None:
+        return None
+    _count("local")
+    _count(kind)
+    logger.info(f"⚡ Answered {kind} lookup locally in {(time.perf_counter() - start) * 1000:.1f} ms "
+                f"({results['match_count']} matches, local share {local_answer_stats()['local_share']:.0%})")
+    return results
@@ -4,11 +4,18 @@ import json
 from typing import Dict, Any
 import logging
 from utils import generate_search_params, query_gemini
+from directories import DEFAULT_DIRECTORY, get_directory
+from local_answers import answer_locally, record_llm_query
+from warmup import WARMUP_ON_STARTUP, warm_up, warm_up_in_background
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Load hot state as soon as the instance starts, ahead of the first request
+if WARMUP_ON_STARTUP:
+    warm_up_in_background()
+
 @functions_framework.http
 def ai_query_assistant(request):
     """HTTP Cloud Function.
@@ -35,8 +42,14 @@ def ai_query_assistant(request):
         "Access-Control-Allow-Origin": "*"
     }
     
+    # Warm-up and readiness check for schedulers and min-instance health checks
+    if request.path.rstrip("/").endswith("/warmup"):
+        status = warm_up()
+        return (jsonify(status), 200 if status["ready"] else 503, headers)
+    
     try:
         query = None
+        directory = None
         logger.info(f"Request method: {request.method}")
         
         # Handle POST request with JSON body
@@ -45,6 +58,7 @@ def ai_query_assistant(request):
             logger.info(f"Request JSON: {request_json}")
             if request_json:
                 query = request_json.get('query') or request_json.get('prompt')
+                directory = request_json.get('directory')
                 logger.info(f"Extracted query: {query}")
         
         # Handle GET request with query parameter
@@ -56,9 +70,23 @@ def ai_query_assistant(request):
             logger.warning("No query/prompt parameter found in request")
             return (jsonify({"error": "No query/prompt parameter provided"}), 400, headers)
             
+        directory = directory or request.args.get("directory") or DEFAULT_DIRECTORY
+        if not isinstance(directory, str):
+            logger.warning(f"Invalid directory requested: {directory!r}")
+            return (jsonify({"error": "directory must be a string"}), 400, headers)
+        if get_directory(directory) is None:
+            logger.warning(f"Unknown directory requested: {directory}")
+            return (jsonify({"error": f"Unknown directory: {directory}"}), 400, headers)
+            
+        # Answer structured lookups (names, categories, phones, domains) without calling Gemini
+        local_results = answer_locally(query, directory)
+        if local_results is not None:
+            return (jsonify(local_results), 200, headers)
+        record_llm_query()
+            
         # Generate search parameters and process business cards using the function from utils.py
-        logger.info(f"Calling generate_search_params with query: {query}")
-        search_results = generate_search_params(query)
+        logger.info(f"Calling generate_search_params with query: {query} (directory: {directory})")
+        search_results = generate_search_params(query, directory)
         logger.info(f"Search results: {search_results}")
         
         if isinstance(search_results, dict) and "error" in search_results:
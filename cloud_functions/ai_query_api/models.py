@@ -0,0 +1,136 @@
+from typing import Dict, Any, List, Optional, Tuple
+import re
+import sys
+import json
+from urllib.parse import urlparse
+
+# Fields extracted from every business card, in response order
+BUSINESS_INFO_FIELDS = ("business_name", "owner_name", "phone_number", "email", "address", "any_other_details")
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a repeated string so every record shares one copy."""
+    return sys.intern(value) if value else value
+
+def normalize_text(value: Optional[str]) -> str:
+    """Normalize text for lookups: lowercase, punctuation removed, whitespace collapsed.
+
+    Args:
+        value (Optional[str]): Text to normalize
+
+    Returns:
+        str: Normalized text, empty if value is empty
+    """
+    if not value:
+        return ""
+    return " ".join(re.sub(r"[^\w\s]", " ", value.lower()).split())
+
+def domain_of(url: Optional[str]) -> Optional[str]:
+    """Get the bare host name of a URL, without a leading www.
+
+    Args:
+        url (Optional[str]): Website URL
+
+    Returns:
+        Optional[str]: Lowercase domain, or None if the URL has no host
+    """
+    if not url:
+        return None
+    netloc = urlparse(url).netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return _intern(netloc) if netloc else None
+
+class BusinessInfo:
+    """Information extracted from a business card image."""
+
+    __slots__ = BUSINESS_INFO_FIELDS
+
+    def __init__(self, business_name: str = None, owner_name: str = None, phone_number: str = None,
+                 email: str = None, address: str = None, any_other_details: Any = None):
+        self.business_name = business_name
+        self.owner_name = owner_name
+        self.phone_number = phone_number
+        self.email = email
+        self.address = address
+        self.any_other_details = any_other_details
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BusinessInfo":
+        """Build from a dict, ignoring unknown keys and defaulting missing fields to None.
+
+        Args:
+            data (Dict[str, Any]): Extracted card fields
+
+        Returns:
+            BusinessInfo: Business card information
+        """
+        return cls(*(data.get(field) for field in BUSINESS_INFO_FIELDS))
+
+    @classmethod
+    def from_json(cls, text: str) -> "BusinessInfo":
+        """Build from the JSON string returned by the image processing function.
+
+        Args:
+            text (str): JSON object text
+
+        Returns:
+            BusinessInfo: Business card information
+        """
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("Business card response is not a JSON object")
+        return cls.from_dict(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the business_info dict used in API responses."""
+        return {field: getattr(self, field) for field in BUSINESS_INFO_FIELDS}
+
+    def is_empty(self) -> bool:
+        """Whether no field could be extracted."""
+        return all(getattr(self, field) is None for field in BUSINESS_INFO_FIELDS)
+
+class BusinessRecord:
+    """A business listed in a directory rolodex."""
+
+    __slots__ = ("name", "category", "business_link", "card_link", "domain")
+
+    def __init__(self, name: str = None, category: str = None, business_link: str = None, card_link: str = None):
+        self.name = name
+        self.category = _intern(category)
+        self.business_link = business_link or None
+        self.card_link = card_link
+        self.domain = domain_of(self.business_link)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "BusinessRecord":
+        """Build from a (name, category, business_link, card_link) row."""
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        """Convert to a compact (name, category, business_link, card_link) row for caching."""
+        return (self.name, self.category, self.business_link, self.card_link)
+
+def dump_index_snapshot(prompt_html: str, records) -> str:
+    """Serialize a parsed directory index to compact JSON with one row per record.
+
+    Args:
+        prompt_html (str): Rolodex HTML snippet sent to Gemini
+        records (Iterable[BusinessRecord]): Records to serialize
+
+    Returns:
+        str: JSON text
+    """
+    return json.dumps({"prompt_html": prompt_html, "rows": [record.to_row() for record in records]},
+                      separators=(",", ":"))
+
+def load_index_snapshot(text: str) -> Tuple[str, List[BusinessRecord]]:
+    """Deserialize a parsed directory index produced by dump_index_snapshot.
+
+    Args:
+        text (str): JSON text
+
+    Returns:
+        Tuple[str, List[BusinessRecord]]: Prompt HTML snippet and records
+    """
+    data = json.loads(text)
+    return data["prompt_html"], [BusinessRecord.from_row(row) for row in data["rows"]]
@@ -1,68 +1,100 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+from collections import OrderedDict
 import requests
 import logging
 import os
+import threading
+import time
 import json
 import google.auth
 import google.auth.transport.requests
-from google.cloud import storage
 from google.cloud import secretmanager
 from google.oauth2 import id_token
 import html2text
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from directories import DEFAULT_DIRECTORY, get_directory, get_directory_index, get_storage_client
+from models import BUSINESS_INFO_FIELDS, BusinessInfo
+from image_store import known_card_images, prefetch_card_images
+from fetch_policy import FETCH_DEADLINE, fetch_html, run_stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_businesses_data() -> str:
-    """Get businesses data from Cloud Storage.
+# Standard prompt for all business cards
+STANDARD_CARD_PROMPT = (
+    "Extract all information from this business card and return it in a JSON format with exactly these keys: "
+    f"{', '.join(BUSINESS_INFO_FIELDS)}. If any field is not found, set it to null."
+)
+
+# Extracted business card information keyed by card URL
+MAX_CACHED_CARDS = int(os.getenv("MAX_CACHED_CARDS", "1000"))
+_card_cache: "OrderedDict[str, BusinessInfo]" = OrderedDict()
+_card_cache_lock = threading.Lock()
+
+# System prompt used when the configuration cannot be read
+OFFLINE_CONFIG = """Please inform the user that Pine (your name) is currently offline and unable to process their request."""
+
+# System prompts are re-read after this many seconds so config uploads take effect
+CONFIG_TTL_SECONDS = int(os.getenv("CONFIG_TTL_SECONDS", "300"))
+_config_cache: Dict[str, Tuple[float, str]] = {}
+
+# Image processing function; also the audience of its ID tokens
+IMAGE_PROCESSING_URL = "https://us-east1-hack-at-davidson25.cloudfunctions.net/image_processing"
+
+# ID tokens are valid for an hour; refresh well before that
+ID_TOKEN_TTL_SECONDS = 3000
+_id_token: Optional[Tuple[float, str]] = None
+
+_api_key: Optional[str] = None
+
+# Reused HTTP session for Gemini and image processing calls
+_http = requests.Session()
+
+def get_businesses_data(directory: str = None) -> str:
+    """Get businesses data for a directory.
     
+    Args:
+        directory (str, optional): Directory id. Defaults to the default directory.
+        
     Returns:
-        str: Line 171 of the HTML content containing all business data.
+        str: The rolodex HTML containing all business data for the directory.
     """
-    storage_client = storage.Client()
-    bucket = storage_client.bucket('pine-config')
-    blob = bucket.blob('lknbusiness-rolodex.html')
-    
-    try:
-        # Download HTML as text and split into lines
-        html_lines = blob.download_as_text().splitlines()
-        
-        # Return line 171 if it exists
-        if len(html_lines) >= 171:
-            # Clean up the HTML line to prevent JSON parsing issues
-            html_line = html_lines[170]  # 0-based index for line 171
-            # Remove any unescaped quotes and normalize whitespace
-            html_line = html_line.replace('\\"', '"').replace('"', '\\"').strip()
-            return html_line
-        logger.error("Business data file does not contain enough lines")
-        return ""
-    except Exception as e:
-        logger.error(f"Error reading businesses data: {e}")
+    index = get_directory_index(directory)
+    if index is None:
+        logger.error(f"Business data unavailable for directory: {directory or DEFAULT_DIRECTORY}")
         return ""
+    return index.prompt_html
 
-def get_config() -> str:
+def get_config(directory: str = None) -> str:
     """Get configuration from Cloud Storage bucket.
     
+    Args:
+        directory (str, optional): Directory id. Defaults to the default directory.
+        
     Returns:
         str: Configuration text containing system prompt
     """
-    try:
-        # Create storage client
-        storage_client = storage.Client()
+    directory = directory or DEFAULT_DIRECTORY
+    cached = _config_cache.get(directory)
+    if cached is not None and time.monotonic() - cached[0] < CONFIG_TTL_SECONDS:
+        return cached[1]
         
-        # Get bucket and blob
-        bucket = storage_client.bucket('pine-config')
-        blob = bucket.blob('pine_config.txt')
+    try:
+        # Get bucket and blob for the directory's system prompt
+        settings = get_directory(directory) or {}
+        bucket = get_storage_client().bucket(settings.get('bucket', 'pine-config'))
+        blob = bucket.blob(settings.get('config_blob', 'pine_config.txt'))
         
         # Download config as text
-        return blob.download_as_text()
+        config = blob.download_as_text()
+        _config_cache[directory] = (time.monotonic(), config)
+        return config
     except Exception as e:
         logger.error(f"Error reading config: {e}")
         # Return default config if unable to read from bucket
-        return """Please inform the user that Pine (your name) is currently offline and unable to process their request."""
+        return OFFLINE_CONFIG
 
 def get_api_key() -> str:
     """Get Gemini API key from Secret Manager.
@@ -70,6 +102,10 @@ def get_api_key() -> str:
     Returns:
         str: API key for Gemini
     """
+    global _api_key
+    if _api_key:
+        return _api_key
+        
     try:
         # Create the Secret Manager client
         client = secretmanager.SecretManagerServiceClient()
@@ -80,8 +116,9 @@ def get_api_key() -> str:
         # Access the secret version
         response = client.access_secret_version(request={"name": name})
         
-        # Return the decoded payload
-        return response.payload.data.decode("UTF-8")
+        # Keep the decoded payload for later requests
+        _api_key = response.payload.data.decode("UTF-8")
+        return _api_key
     except Exception as e:
         logger.error(f"Error getting API key: {e}")
         return None
@@ -103,11 +140,8 @@ def query_gemini(prompt: str, temperature: float = None, max_tokens: int = None)
         if not api_key:
             raise Exception("Unable to get API key")
             
-        # Get businesses data
-        businesses_html = get_businesses_data()
-        
         # Make API request
-        response = requests.post(
+        response = _http.post(
             "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent",
             headers={"Content-Type": "application/json"},
             params={"key": api_key},
@@ -238,6 +272,10 @@ def get_id_token() -> str:
     Returns:
         str: ID token for authentication
     """
+    global _id_token
+    if _id_token is not None and time.monotonic() - _id_token[0] < ID_TOKEN_TTL_SECONDS:
+        return _id_token[1]
+        
     try:
         # Get credentials and target audience
         creds, project = google.auth.default()
@@ -249,41 +287,81 @@ def get_id_token() -> str:
         # Get ID token with the correct audience (image processing function URL)
         id_token = google.oauth2.id_token.fetch_id_token(
             auth_req, 
-            "https://us-east1-hack-at-davidson25.cloudfunctions.net/image_processing"
+            IMAGE_PROCESSING_URL
         )
+        _id_token = (time.monotonic(), id_token)
         return id_token
     except Exception as e:
         logger.error(f"Error getting ID token: {e}")
         return None
 
-def process_business_card(card_url: str) -> Dict[str, Any]:
+def warm_up_image_processing() -> bool:
+    """Call the image processing function's warm-up endpoint so its model is built before the first card.
+
+    Returns:
+        bool: Whether the function reported it is ready
+    """
+    id_token = get_id_token()
+    if not id_token:
+        return False
+    try:
+        response = _http.get(
+            f"{IMAGE_PROCESSING_URL}/warmup",
+            headers={"Authorization": f"Bearer {id_token}"},
+            timeout=25
+        )
+        return response.status_code == 200
+    except Exception as e:
+        logger.error(f"Error warming up image processing: {e}")
+        return False
+
+def get_cached_card_info(card_url: str) -> Optional[BusinessInfo]:
+    """Get previously extracted business card information without calling the API.
+    
+    Args:
+        card_url (str): URL of the business card image
+        
+    Returns:
+        Optional[BusinessInfo]: Cached information, or None if the card has not been processed
+    """
+    with _card_cache_lock:
+        info = _card_cache.get(card_url)
+        if info is not None:
+            _card_cache.move_to_end(card_url)
+        return info
+
+def process_business_card(card_url: str, image_url: str = None) -> BusinessInfo:
     """Process a business card image using the image processing API.
     
     Args:
         card_url (str): URL of the business card image
+        image_url (str, optional): Stored copy of the card to read instead of
+            the original URL. Defaults to None.
         
     Returns:
-        Dict[str, Any]: Dictionary containing extracted business information
+        BusinessInfo: Extracted business information
     """
-    try:
-        # Standard prompt for all business cards
-        STANDARD_PROMPT = "Extract all information from this business card and return it in a JSON format with exactly these keys: business_name, owner_name, phone_number, email, address, any_other_details. If any field is not found, set it to null."
+    cached = get_cached_card_info(card_url)
+    if cached is not None:
+        logger.info(f"📇 Using cached business card information for {card_url}")
+        return cached
         
+    try:
         # Get authentication token
         id_token = get_id_token()
         if not id_token:
             raise Exception("Failed to get authentication token")
         
         # Call image processing API with authentication
-        response = requests.post(
-            "https://us-east1-hack-at-davidson25.cloudfunctions.net/image_processing",
+        response = _http.post(
+            IMAGE_PROCESSING_URL,
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {id_token}"
             },
             json={
-                "prompt": STANDARD_PROMPT,
-                "image_url": card_url
+                "prompt": STANDARD_CARD_PROMPT,
+                "image_url": image_url or card_url
             },
             timeout=25  # Set timeout to less than the function's 30s timeout
         )
@@ -291,27 +369,21 @@ def process_business_card(card_url: str) -> Dict[str, Any]:
         if response.status_code != 200:
             raise Exception(f"API request failed with status {response.status_code}: {response.text}")
         
-        # Parse the response JSON and ensure it has the required structure
-        extracted_info = json.loads(response.json().get("response", "{}"))
+        # Parse the response JSON; missing fields default to None
+        business_info = BusinessInfo.from_json(response.json().get("response", "{}"))
         
-        # Ensure all required fields exist
-        required_fields = ["business_name", "owner_name", "phone_number", "email", "address", "any_other_details"]
-        for field in required_fields:
-            if field not in extracted_info:
-                extracted_info[field] = None
+        # Only cache cards the model could read
+        if not business_info.is_empty():
+            with _card_cache_lock:
+                _card_cache[card_url] = business_info
+                while len(_card_cache) > MAX_CACHED_CARDS:
+                    _card_cache.popitem(last=False)
                 
-        return extracted_info
+        return business_info
         
     except Exception as e:
         logger.error(f"Error processing business card: {e}")
-        return {
-            "business_name": None,
-            "owner_name": None,
-            "phone_number": None,
-            "email": None,
-            "address": None,
-            "any_other_details": None
-        }
+        return BusinessInfo()
 
 def get_website_content(url: str) -> str:
     """Safely fetch and extract content from a business website.
@@ -331,28 +403,13 @@ def get_website_content(url: str) -> str:
             logger.warning(f"❌ Invalid URL format: {url}")
             return ""
             
-        # Set headers to mimic a browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        }
-            
-        # Fetch content with timeout
+        # Fetch content within the fetch policy's deadline, hedging slow hosts
         logger.info(f"📥 Fetching HTML content from {url}")
-        try:
-            response = requests.get(url, timeout=15, verify=True, headers=headers)
-            response.raise_for_status()
-            html_content = response.text
-            logger.info(f"✅ Successfully fetched {len(html_content)} bytes from {url}")
-        except requests.exceptions.SSLError:
-            # Try again without SSL verification if SSL fails
-            logger.warning(f"⚠️ SSL verification failed for {url}, retrying without verification")
-            response = requests.get(url, timeout=15, verify=False, headers=headers)
-            response.raise_for_status()
-            html_content = response.text
-            logger.info(f"✅ Successfully fetched {len(html_content)} bytes from {url} (without SSL verification)")
+        html_content, served_url = fetch_html(url)
+        if html_content is None:
+            logger.warning(f"❌ No content fetched from {url} within {FETCH_DEADLINE}s")
+            return ""
+        logger.info(f"✅ Successfully fetched {len(html_content)} bytes from {served_url}")
         
         # Parse HTML and extract text
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -384,11 +441,12 @@ def get_website_content(url: str) -> str:
         logger.error(f"❌ Unexpected error processing content from {url}: {e}")
         return ""
 
-def generate_search_params(query: str) -> Dict[str, Any]:
+def generate_search_params(query: str, directory: str = None) -> Dict[str, Any]:
     """Generate search parameters based on user query.
     
     Args:
         query (str): User's search query
+        directory (str, optional): Directory id. Defaults to the default directory.
         
     Returns:
         Dict[str, Any]: Search results with matched businesses
@@ -397,10 +455,10 @@ def generate_search_params(query: str) -> Dict[str, Any]:
         logger.info(f"🔍 Processing query: {query}")
         
         # Get system prompt
-        system_prompt = get_config()
+        system_prompt = get_config(directory)
         
         # Get businesses data
-        businesses_html = get_businesses_data()
+        businesses_html = get_businesses_data(directory)
         if not businesses_html:
             return {"error": "Unable to load business data"}
             
@@ -437,6 +495,20 @@ def generate_search_params(query: str) -> Dict[str, Any]:
                 "best_match": raw_result.get("best_match", {})
             }
             
+            # Store every matched card in the background while the websites are fetched;
+            # OCR reads the stored original and the interface gets a thumbnail
+            card_links = [b.get("card_link") for b in raw_result.get("matched_businesses", [])]
+            prefetch_card_images(card_links, timeout=0)
+            
+            # Fetch every matched website concurrently, bounded by the stage deadline
+            fetched_websites = run_stage(get_website_content, [
+                b["business_link"] for b in raw_result.get("matched_businesses", [])
+                if b.get("card_link") and b.get("business_link")
+            ])
+            
+            # Cards not stored by now fall back to card_link and keep going in the background
+            card_images = known_card_images(card_links)
+            
             # Process each business
             website_contents = {}
             successful_fetches = 0
@@ -444,13 +516,13 @@ def generate_search_params(query: str) -> Dict[str, Any]:
                 if "card_link" in business:
                     # Process the business card
                     logger.info(f"💼 Processing business card for: {business.get('business_link', 'Unknown Business')}")
-                    business_info = process_business_card(business["card_link"])
+                    card_image = card_images.get(business["card_link"], {})
+                    business_info = process_business_card(business["card_link"], card_image.get("original_url"))
                     
                     # Fetch website content if available
                     website_content = ""
                     if business.get("business_link"):
-                        logger.info(f"🌐 Fetching website content for potential match: {business['business_link']}")
-                        website_content = get_website_content(business["business_link"])
+                        website_content = fetched_websites.get(business["business_link"], "")
                         if website_content:
                             logger.info(f"✅ Successfully fetched website content ({len(website_content)} chars)")
                             website_contents[business["business_link"]] = website_content
@@ -460,9 +532,10 @@ def generate_search_params(query: str) -> Dict[str, Any]:
                     
                     # Add to final results with all required fields
                     final_results["matched_businesses"].append({
-                        "business_info": business_info,
+                        "business_info": business_info.to_dict(),
                         "homepage_link": business.get("business_link"),
-                        "card_link": business["card_link"]
+                        "card_link": business["card_link"],
+                        "thumbnail_url": card_image.get("thumbnail_url")
                     })
             
             # If we have enough website contents, use them to refine the best match
@@ -497,7 +570,7 @@ def generate_search_params(query: str) -> Dict[str, Any]:
                                     final_results["best_match"] = {
                                         "business_link": business["business_link"],
                                         "card_link": business["card_link"],
-                                        "business_name": business_info.get("business_name"),
+                                        "business_name": business_info.business_name,
                                         "reason": analysis_result.get("reason", "Best match based on website content analysis")
                                     }
                                     break
@@ -543,6 +616,10 @@ def generate_search_params(query: str) -> Dict[str, Any]:
                     except json.JSONDecodeError:
                         logger.error("❌ Failed to parse card analysis result")
             
+            best_card_link = final_results["best_match"].get("card_link")
+            if best_card_link in card_images:
+                final_results["best_match"]["thumbnail_url"] = card_images[best_card_link]["thumbnail_url"]
+            
             final_results["match_count"] = len(final_results["matched_businesses"])
             logger.info(f"✅ Final results: {final_results['match_count']} businesses, best match determined: {'best_match' in final_results}")
             return final_results
@@ -0,0 +1,113 @@
+from typing import Dict, Any, List
+import json
+import logging
+import os
+import threading
+import time
+from directories import DEFAULT_DIRECTORY, directory_stats, get_directory_index, get_storage_client
+from fetch_policy import website_fetch_stats
+from local_answers import local_answer_stats
+from utils import OFFLINE_CONFIG, get_api_key, get_config, get_id_token, warm_up_image_processing
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directories to load ahead of traffic, comma separated
+WARMUP_DIRECTORIES = [d.strip() for d in os.getenv("WARMUP_DIRECTORIES", DEFAULT_DIRECTORY).split(",") if d.strip()]
+
+# Whether to warm up in the background when the instance starts
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+_status: Dict[str, Any] = {"ready": False, "state": "cold", "components": {}}
+_status_lock = threading.Lock()
+_warmup_lock = threading.Lock()
+
+def _check(components: Dict[str, Any], name: str, func) -> None:
+    """Run one warm-up step and record whether it succeeded and how long it took.
+
+    Errors are only logged; the endpoint is public, so the recorded status
+    holds nothing but the outcome and timing.
+    """
+    start = time.perf_counter()
+    try:
+        ok = bool(func())
+        error = None if ok else "returned no value"
+    except Exception as e:
+        ok = False
+        error = str(e)
+    components[name] = {"ok": ok, "ms": round((time.perf_counter() - start) * 1000, 1)}
+    if error:
+        logger.warning(f"⚠️ Warm-up step {name} failed: {error}")
+
+def warm_up(directories: List[str] = None) -> Dict[str, Any]:
+    """Load hot state so the first user request runs at steady-state latency.
+
+    Loads the storage client, each directory's parsed index and system
+    prompt, the Gemini API key and the image processing ID token, then
+    warms the image processing function through its authenticated /warmup.
+    Safe to call repeatedly; cached state makes later calls cheap.
+
+    Args:
+        directories (List[str], optional): Directories to load. Defaults to WARMUP_DIRECTORIES.
+
+    Returns:
+        Dict[str, Any]: Readiness status
+    """
+    with _warmup_lock:
+        with _status_lock:
+            _status["state"] = "warming"
+        start = time.perf_counter()
+        components: Dict[str, Any] = {}
+
+        _check(components, "storage_client", get_storage_client)
+        for directory in directories or WARMUP_DIRECTORIES:
+            _check(components, f"directory:{directory}", lambda d=directory: get_directory_index(d))
+            _check(components, f"config:{directory}", lambda d=directory: get_config(d) != OFFLINE_CONFIG)
+        _check(components, "api_key", get_api_key)
+        _check(components, "id_token", get_id_token)
+        _check(components, "image_processing", warm_up_image_processing)
+
+        ready = all(c["ok"] for c in components.values())
+        with _status_lock:
+            _status.update({
+                "ready": ready,
+                "state": "ready" if ready else "degraded",
+                "components": components,
+                "warmup_ms": round((time.perf_counter() - start) * 1000, 1)
+            })
+        logger.info(f"🔥 Warm-up finished in {_status['warmup_ms']} ms, ready: {ready}")
+        logger.info(f"📊 Instance stats: {json.dumps(instance_stats())}")
+        return readiness()
+
+def readiness() -> Dict[str, Any]:
+    """Report whether hot state is loaded and how long each step took.
+
+    Safe to return publicly: only booleans and timings.
+
+    Returns:
+        Dict[str, Any]: Readiness status
+    """
+    with _status_lock:
+        status = dict(_status)
+    status["components"] = {name: dict(c) for name, c in status["components"].items()}
+    return status
+
+def instance_stats() -> Dict[str, Any]:
+    """Report cache and traffic stats for this instance.
+
+    These name directories and website hosts, so they go to the logs rather
+    than the public warm-up response.
+
+    Returns:
+        Dict[str, Any]: Directory memory, local answer and website fetch stats
+    """
+    return {
+        "directories": directory_stats(),
+        "local_answers": local_answer_stats(),
+        "website_fetches": website_fetch_stats()
+    }
+
+def warm_up_in_background() -> None:
+    """Start warming up without blocking instance startup."""
+    threading.Thread(target=warm_up, name="warmup", daemon=True).start()
@@ -0,0 +1,238 @@
+"""Extraction quality versus cost benchmark for image_processing.
+
+Replays recorded model responses for a fixed corpus of business card images
+through the same cleanup and JSON parsing used by handle_request, and
+compares configurations (model, image size) on parse success, field-level
+accuracy against labels, latency and upload payload size.
+
+A small labeled corpus ships in extraction_corpus/ and is used by default.
+Its recordings/baseline.json holds the labels themselves in the shapes the
+model returns (fenced and bare JSON), so it is the accuracy ceiling; record
+a real configuration against it before comparing.
+
+Corpus layout:
+    <corpus>/manifest.json
+        {"cards": [{"id": "alberts_lynn", "image": "images/alberts_lynn.jpg",
+                    "label": {"business_name": ..., "phone_number": ..., ...}}]}
+    <corpus>/recordings/<config>.json
+        {"config": {"model": ..., "max_px": ...},
+         "responses": {"<card id>": {"text": ..., "latency_ms": ..., "payload_bytes": ...}}}
+
+Usage:
+    # Record responses for a configuration (calls Gemini, needs GENAI_API_KEY)
+    python extraction_benchmark.py record --config flash-8b-800 --model gemini-1.5-flash-8b --max-px 800
+
+    # Compare recorded configurations offline; the first is the baseline
+    python extraction_benchmark.py report baseline flash-8b-800 [--max-accuracy-drop 0.02] [--corpus DIR]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "image_processing"))
+
+from parsing import BUSINESS_INFO_FIELDS, parse_business_info  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_corpus")
+
+# Free-text details are not compared against labels
+SCORED_FIELDS = [field for field in BUSINESS_INFO_FIELDS if field != "any_other_details"]
+
+STANDARD_PROMPT = (
+    "Extract all information from this business card and return it in a JSON format with exactly these keys: "
+    f"{', '.join(BUSINESS_INFO_FIELDS)}. If any field is not found, set it to null."
+)
+
+def load_manifest(corpus):
+    """Load the labeled card list of a corpus."""
+    with open(os.path.join(corpus, "manifest.json")) as f:
+        return json.load(f)["cards"]
+
+def recording_path(corpus, config):
+    """Get the path of a configuration's recorded responses."""
+    return os.path.join(corpus, "recordings", f"{config}.json")
+
+def normalize_field(field, value):
+    """Normalize a field value for comparison; phone numbers compare by digits."""
+    if value is None:
+        return ""
+    value = str(value)
+    if field == "phone_number":
+        return re.sub(r"\D", "", value)[-10:]
+    return " ".join(re.sub(r"[^\w\s@.]", " ", value.lower()).split())
+
+def _percentile(values, p):
+    """Get the p-th percentile (0-100) of values, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+def score_config(cards, recording):
+    """Score one configuration's recorded responses against the labels.
+
+    Args:
+        cards (list): Corpus manifest entries
+        recording (dict): Recorded responses for the configuration
+
+    Returns:
+        dict: Parse success rate, field accuracy, latency, payload and cleanup timings
+    """
+    responses = recording["responses"]
+    parsed_ok = 0
+    field_hits = {field: 0 for field in SCORED_FIELDS}
+    latencies = []
+    payloads = []
+    cleanup_us = []
+    scored = 0
+
+    for card in cards:
+        response = responses.get(card["id"])
+        if response is None:
+            continue
+        scored += 1
+
+        start = time.perf_counter()
+        text, ok = parse_business_info(response["text"])
+        cleanup_us.append((time.perf_counter() - start) * 1e6)
+        parsed_ok += ok
+
+        extracted = json.loads(text)
+        if not isinstance(extracted, dict):
+            extracted = {}
+        for field in SCORED_FIELDS:
+            if normalize_field(field, extracted.get(field)) == normalize_field(field, card["label"].get(field)):
+                field_hits[field] += 1
+
+        if response.get("latency_ms") is not None:
+            latencies.append(response["latency_ms"])
+        if response.get("payload_bytes") is not None:
+            payloads.append(response["payload_bytes"])
+
+    if not scored:
+        raise ValueError("Recording has no responses for cards in the corpus")
+
+    field_accuracy = {field: hits / scored for field, hits in field_hits.items()}
+    return {
+        "cards": scored,
+        "parse_success": parsed_ok / scored,
+        "field_accuracy": field_accuracy,
+        "accuracy": statistics.mean(field_accuracy.values()),
+        "latency_p50_ms": _percentile(latencies, 50),
+        "latency_p95_ms": _percentile(latencies, 95),
+        "payload_mean_bytes": statistics.mean(payloads) if payloads else None,
+        "cleanup_mean_us": statistics.mean(cleanup_us)
+    }
+
+def _fmt(value, spec):
+    """Format a metric, showing missing values as a dash."""
+    if value is None:
+        return format("-", spec.split(".")[0])
+    return format(value, spec)
+
+def report(corpus, configs, max_accuracy_drop=None):
+    """Print a comparison of configurations against the first one.
+
+    Args:
+        corpus (str): Corpus directory
+        configs (list): Configuration names; the first is the baseline
+        max_accuracy_drop (float, optional): Largest accepted drop in parse
+            success or field accuracy versus the baseline
+
+    Returns:
+        bool: Whether every configuration is within the accepted drop
+    """
+    cards = load_manifest(corpus)
+    results = {}
+    for config in configs:
+        with open(recording_path(corpus, config)) as f:
+            results[config] = score_config(cards, json.load(f))
+
+    header = f"{'config':<24} {'cards':>5} {'parse':>7} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8} {'payload B':>10} {'cleanup us':>11}"
+    print(header)
+    print("-" * len(header))
+    for config, r in results.items():
+        print(f"{config:<24} {r['cards']:>5} {r['parse_success']:>7.1%} {r['accuracy']:>9.1%} "
+              f"{_fmt(r['latency_p50_ms'], '>8.0f')} {_fmt(r['latency_p95_ms'], '>8.0f')} "
+              f"{_fmt(r['payload_mean_bytes'], '>10.0f')} {r['cleanup_mean_us']:>11.1f}")
+
+    print()
+    print(f"{'field':<24} " + " ".join(f"{config[:12]:>12}" for config in results))
+    for field in SCORED_FIELDS:
+        print(f"{field:<24} " + " ".join(f"{r['field_accuracy'][field]:>12.1%}" for r in results.values()))
+
+    accepted = True
+    if max_accuracy_drop is not None:
+        baseline = results[configs[0]]
+        print()
+        for config in configs[1:]:
+            r = results[config]
+            drop = max(baseline["parse_success"] - r["parse_success"], baseline["accuracy"] - r["accuracy"])
+            ok = drop <= max_accuracy_drop
+            accepted = accepted and ok
+            print(f"{config}: {'ACCEPT' if ok else 'REJECT'} (largest drop {drop:.1%}, allowed {max_accuracy_drop:.1%})")
+    return accepted
+
+def record(corpus, config, model, max_px, prompt=STANDARD_PROMPT):
+    """Run every corpus card through Gemini and save the responses.
+
+    Args:
+        corpus (str): Corpus directory
+        config (str): Name to save the recording under
+        model (str): Gemini model name
+        max_px (int): Longest image edge, or None for the service's IMAGE_MAX_PX
+        prompt (str): Extraction prompt
+    """
+    from main import IMAGE_MAX_PX, generate_content, resize_image
+
+    # Resolve the size once so the measured payload is the one that is sent
+    max_px = max_px or IMAGE_MAX_PX
+
+    responses = {}
+    for card in load_manifest(corpus):
+        image_path = os.path.join(corpus, card["image"])
+        upload_path = resize_image(image_path, max_px) if max_px else image_path
+        payload_bytes = os.path.getsize(upload_path)
+        if upload_path != image_path:
+            os.unlink(upload_path)
+
+        start = time.perf_counter()
+        try:
+            text = generate_content(image_path, prompt, model_name=model, max_px=max_px)
+        except Exception as e:
+            text = f"ERROR: {e}"
+        latency_ms = (time.perf_counter() - start) * 1000
+        responses[card["id"]] = {"text": text, "latency_ms": latency_ms, "payload_bytes": payload_bytes}
+        print(f"{card['id']}: {latency_ms:.0f} ms, {payload_bytes} bytes, {'ok' if parse_business_info(text)[1] else 'unparseable'}")
+
+    os.makedirs(os.path.join(corpus, "recordings"), exist_ok=True)
+    with open(recording_path(corpus, config), "w") as f:
+        json.dump({"config": {"model": model, "max_px": max_px}, "responses": responses}, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="record model responses for a configuration")
+    record_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    record_parser.add_argument("--config", required=True)
+    record_parser.add_argument("--model", default="gemini-1.5-flash-8b")
+    record_parser.add_argument("--max-px", type=int, default=None)
+
+    report_parser = subparsers.add_parser("report", help="compare recorded configurations offline")
+    report_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    report_parser.add_argument("--max-accuracy-drop", type=float, default=None)
+    report_parser.add_argument("configs", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.corpus, args.config, args.model, args.max_px)
+    else:
+        sys.exit(0 if report(args.corpus, args.configs, args.max_accuracy_drop) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Memory benchmark for the business catalog representation.
+
+Builds synthetic catalogs of 300, 10k and 100k businesses shaped like the
+Lake Norman rolodex (directory fields plus extracted card information) and
+reports the bytes used per business for plain dicts versus the __slots__
+records in ai_query_api/models.py.
+
+Usage:
+    python memory_benchmark.py [--sizes 300 10000 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_query_api"))
+
+from models import BusinessInfo, BusinessRecord  # noqa: E402
+
+CATEGORIES = [
+    "Personal Services", "Pet Services", "Business Services", "Financial Services", "Legal Services",
+    "Building, Construction and Remodeling", "Real Estate and Related", "Vehicle Sales and Service",
+    "Fashion and Retail", "Artists, Graphics, and Signs", "Media and Entertainment", "Events and Recreation",
+    "Health and Fitness", "Food and Drink", "Government and Non-Profit"
+]
+
+def _row(i: int) -> tuple:
+    """Build fresh strings for one synthetic business, as parsing would."""
+    category = CATEGORIES[i % len(CATEGORIES)].encode().decode()
+    name = f"Owner {i} Lastname{i}"
+    link = f"https://www.business{i}.com/" if i % 4 else ""
+    card = f"https://shoplakenormanlkn.com/images/lastname{i}_owner{i}.jpg"
+    info = (f"Business {i} LLC", name, f"704-555-{i % 10000:04d}", f"owner{i}@business{i}.com",
+            f"{i} Main St, Davidson, NC 28036", None)
+    return name, category, link, card, info
+
+def build_dicts(n: int) -> list:
+    """Build the catalog as plain dicts."""
+    catalog = []
+    for i in range(n):
+        name, category, link, card, info = _row(i)
+        catalog.append({
+            "name": name,
+            "category": category,
+            "business_link": link or None,
+            "card_link": card,
+            "business_info": dict(zip(BusinessInfo.__slots__, info))
+        })
+    return catalog
+
+def build_records(n: int) -> list:
+    """Build the catalog as slotted records with interned categories and domains."""
+    catalog = []
+    for i in range(n):
+        name, category, link, card, info = _row(i)
+        catalog.append((BusinessRecord(name, category, link, card), BusinessInfo(*info)))
+    return catalog
+
+def measure(builder, n: int) -> float:
+    """Measure the bytes allocated per business by a catalog builder."""
+    gc.collect()
+    tracemalloc.start()
+    catalog = builder(n)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    return current / n
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'businesses':>12} {'dict B/biz':>12} {'slots B/biz':>12} {'saving':>8}")
+    for n in args.sizes:
+        dict_bytes = measure(build_dicts, n)
+        record_bytes = measure(build_records, n)
+        saving = 1 - record_bytes / dict_bytes
+        print(f"{n:>12} {dict_bytes:>12.0f} {record_bytes:>12.0f} {saving:>8.1%}")
+
+if __name__ == "__main__":
+    main()
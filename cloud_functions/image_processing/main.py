@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 import requests
 import tempfile
 from urllib.parse import urlparse
+from parsing import BUSINESS_INFO_FIELDS, parse_business_info
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +15,51 @@ load_dotenv()
 # Configure the API key
 genai.configure(api_key=os.getenv('GENAI_API_KEY'))
 
+# Model and largest image edge in pixels (unset keeps the original size)
+GENAI_MODEL = os.getenv('GENAI_MODEL', 'gemini-1.5-flash-8b')
+IMAGE_MAX_PX = int(os.getenv('IMAGE_MAX_PX', '0')) or None
+
+# Reused HTTP session for image downloads
+http_session = requests.Session()
+
+# Model objects keyed by model name, built once per instance
+_models = {}
+
+def get_model(model_name=None):
+    """Get the GenerativeModel for a model name, creating it on first use.
+    
+    Args:
+        model_name (str, optional): Gemini model, defaults to GENAI_MODEL
+        
+    Returns:
+        GenerativeModel: Model object
+    """
+    model_name = model_name or GENAI_MODEL
+    if model_name not in _models:
+        _models[model_name] = genai.GenerativeModel(model_name=model_name)
+    return _models[model_name]
+
+def warm_up():
+    """Build the model and check the API key so the first request runs warm.
+    
+    Returns:
+        dict: Readiness status
+    """
+    components = {}
+    try:
+        get_model()
+        components['model'] = {'ok': True}
+    except Exception as e:
+        # Only printed to the logs; the status is returned to callers
+        print(f"Warm-up could not build the model: {e}")
+        components['model'] = {'ok': False}
+    components['api_key'] = {'ok': bool(os.getenv('GENAI_API_KEY'))}
+    return {'ready': all(c['ok'] for c in components.values()), 'components': components}
+
+# Build the model when the instance starts, ahead of the first request
+if os.getenv('WARMUP_ON_STARTUP', 'true').lower() == 'true':
+    warm_up()
+
 def download_image(image_url):
     """Download image from URL and save to temporary file.
     
@@ -30,7 +76,7 @@ def download_image(image_url):
             raise ValueError("Invalid URL provided")
             
         # Download image
-        response = requests.get(image_url, stream=True)
+        response = http_session.get(image_url, stream=True)
         response.raise_for_status()
         
         # Create temporary file
@@ -43,11 +89,31 @@ def download_image(image_url):
     except Exception as e:
         raise Exception(f"Failed to download image: {str(e)}")
 
-def upload_image(image_source):
+def resize_image(image_path, max_px):
+    """Downscale an image so its longest edge is at most max_px.
+    
+    Args:
+        image_path (str): Path of the image to resize
+        max_px (int): Longest edge in pixels
+        
+    Returns:
+        str: Path to a resized temporary JPEG, or image_path if already small enough
+    """
+    with Image.open(image_path) as image:
+        if max(image.size) <= max_px:
+            return image_path
+        image = image.convert('RGB')
+        image.thumbnail((max_px, max_px))
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
+            image.save(temp_file, format='JPEG', quality=90)
+            return temp_file.name
+
+def upload_image(image_source, max_px=None):
     """Upload an image to Gemini from either a local path or URL.
     
     Args:
         image_source (str): Local file path or URL of the image
+        max_px (int, optional): Longest edge to downscale to before uploading
         
     Returns:
         file: Uploaded file object
@@ -64,11 +130,16 @@ def upload_image(image_source):
             if not os.path.exists(image_path):
                 raise FileNotFoundError(f"Image file '{image_path}' not found.")
         
+        # Downscale large images to reduce the upload and token cost
+        upload_path = resize_image(image_path, max_px) if max_px else image_path
+        
         # Upload to Gemini
-        file = genai.upload_file(image_path, mime_type='image/jpeg')
+        file = genai.upload_file(upload_path, mime_type='image/jpeg')
         print(f"Uploaded file '{file.display_name}' as: {file.uri}")
         
-        # Clean up temporary file if it was downloaded
+        # Clean up temporary files
+        if upload_path != image_path:
+            os.unlink(upload_path)
         if parsed.scheme and parsed.netloc:
             os.unlink(image_path)
             
@@ -77,22 +148,24 @@ def upload_image(image_source):
     except Exception as e:
         raise Exception(f"Failed to upload image: {str(e)}")
 
-def generate_content(image_source, prompt):
+def generate_content(image_source, prompt, model_name=None, max_px=None):
     """Generate content based on the image and prompt.
     
     Args:
         image_source (str): Local file path or URL of the image
         prompt (str): Prompt for the model
+        model_name (str, optional): Gemini model, defaults to GENAI_MODEL
+        max_px (int, optional): Longest image edge, defaults to IMAGE_MAX_PX
         
     Returns:
         str: Generated content
     """
     try:
         # Upload the image
-        file = upload_image(image_source)
+        file = upload_image(image_source, max_px or IMAGE_MAX_PX)
 
-        # Create the model
-        model = genai.GenerativeModel(model_name='gemini-1.5-flash-8b')
+        # Get the model
+        model = get_model(model_name)
 
         # Add instruction for clean JSON format
         full_prompt = (
@@ -100,7 +173,7 @@ def generate_content(image_source, prompt):
             "Return ONLY a clean JSON string without any markdown formatting, code blocks, or special characters. "
             "The response should be a single line, directly parseable as JSON. "
             "For any fields where information is not found, use null instead of omitting the field. "
-            "Always include all fields in the response: business_name, owner_name, phone_number, email, address, and any_other_details. "
+            f"Always include all fields in the response: {', '.join(BUSINESS_INFO_FIELDS)}. "
             "If text is in all caps or formatted strangely, convert it to pronoun form or a proper sentence where appropriate."
         )
 
@@ -129,6 +202,11 @@ def handle_request(request):
         'Access-Control-Allow-Origin': '*'
     }
 
+    # Warm-up and readiness check for schedulers and min-instance health checks
+    if request.path.rstrip('/').endswith('/warmup'):
+        status = warm_up()
+        return (json.dumps(status), 200 if status['ready'] else 503, headers)
+
     try:
         request_json = request.get_json()
         if not request_json or 'prompt' not in request_json or 'image_url' not in request_json:
@@ -138,26 +216,9 @@ def handle_request(request):
         image_url = request_json['image_url']
         response = generate_content(image_url, prompt)
 
-        # Clean any potential leftover special characters or whitespace
-        response = response.strip()
-        if response.startswith('```') and response.endswith('```'):
-            response = response[3:-3]
-        if response.startswith('json'):
-            response = response[4:]
-        response = response.strip()
-
-        # Ensure we have a valid JSON string
-        try:
-            json.loads(response)  # Validate JSON
-        except json.JSONDecodeError:
-            response = json.dumps({
-                "business_name": None,
-                "owner_name": None,
-                "phone_number": None,
-                "email": None,
-                "address": None,
-                "any_other_details": None
-            })
+        # Clean any potential leftover special characters or whitespace and
+        # ensure we have a valid JSON string
+        response, _ = parse_business_info(response)
 
         return (json.dumps({'response': response}), 200, headers)
 
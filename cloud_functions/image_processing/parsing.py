@@ -0,0 +1,37 @@
+import json
+
+# Fields extracted from every business card (mirrors ai_query_api/models.py)
+BUSINESS_INFO_FIELDS = ("business_name", "owner_name", "phone_number", "email", "address", "any_other_details")
+
+def clean_response(response):
+    """Strip whitespace and markdown code fences from a model response.
+
+    Args:
+        response (str): Raw model output
+
+    Returns:
+        str: Cleaned response text
+    """
+    response = response.strip()
+    if response.startswith('```') and response.endswith('```'):
+        response = response[3:-3]
+    if response.startswith('json'):
+        response = response[4:]
+    return response.strip()
+
+def parse_business_info(response):
+    """Clean a model response and make sure it is a valid JSON string.
+
+    Args:
+        response (str): Raw model output
+
+    Returns:
+        tuple: (JSON string, whether the model output parsed). Unparseable
+            output is replaced by an object with every field set to null.
+    """
+    response = clean_response(response)
+    try:
+        json.loads(response)  # Validate JSON
+        return response, True
+    except json.JSONDecodeError:
+        return json.dumps({field: None for field in BUSINESS_INFO_FIELDS}), False
@@ -1,7 +1,8 @@
 export interface Business {
     business_info: BusinessInfo,
     card_link: string,
-    homepage_link: string
+    homepage_link: string,
+    thumbnail_url?: string | null
 }
 
 export interface BusinessInfo {
@@ -20,6 +21,7 @@ export interface BResponse {
         business_link: string,
         card_link: string,
         business_name: string,
+        thumbnail_url?: string | null,
         reason: string
     }
 }
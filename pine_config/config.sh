@@ -15,6 +15,10 @@ gsutil cp pine_config.txt "gs://${BUCKET_NAME}/pine_config.txt"
 echo "📤 Uploading business rolodex..."
 gsutil cp lknbusiness-rolodex.html "gs://${BUCKET_NAME}/lknbusiness-rolodex.html"
 
+# Upload directory registry
+echo "📤 Uploading directory registry..."
+gsutil cp directories.json "gs://${BUCKET_NAME}/directories.json"
+
 # Set public read access
 gsutil acl ch -u AllUsers:R "gs://${BUCKET_NAME}/pine_config.txt"
 gsutil acl ch -u AllUsers:R "gs://${BUCKET_NAME}/lknbusiness-rolodex.html"